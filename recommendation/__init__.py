@@ -6,7 +6,7 @@ shapes agent behavior, and determines network dynamics.
 """
 
 from .base import RecommendationSystem, RecommendationMetrics
-from .system import CentralizedRecommendationSystem
+from .system import CentralizedRecommendationSystem, format_timestamp_ns
 from .strategies import (
     ChronologicalStrategy,
     EngagementStrategy,
@@ -20,6 +20,7 @@ __all__ = [
     'RecommendationSystem',
     'RecommendationMetrics',
     'CentralizedRecommendationSystem',
+    'format_timestamp_ns',
     'ChronologicalStrategy',
     'EngagementStrategy',
     'InterestStrategy',
@@ -6,6 +6,7 @@ Each strategy implements a different algorithm for ranking and filtering content
 
 from typing import List, Dict, Any
 from datetime import datetime
+import heapq
 import random
 from collections import Counter
 
@@ -24,10 +25,11 @@ class ChronologicalStrategy:
         context: Dict[str, Any]
     ) -> List[Any]:
         """Rank by creation time, newest first."""
-        logger.debug("Ranking feeds chronologically", extra={
-            "agent_id": agent_id,
-            "feed_count": len(feeds)
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ranking feeds chronologically", extra={
+                "agent_id": agent_id,
+                "feed_count": len(feeds)
+            })
         
         return sorted(
             feeds,
@@ -46,23 +48,25 @@ class EngagementStrategy:
         context: Dict[str, Any]
     ) -> List[Any]:
         """Rank by engagement score."""
-        logger.debug("Ranking feeds by engagement", extra={
-            "agent_id": agent_id,
-            "feed_count": len(feeds)
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ranking feeds by engagement", extra={
+                "agent_id": agent_id,
+                "feed_count": len(feeds)
+            })
         
-        def engagement_score(feed):
-            metrics = getattr(feed, 'public_metrics', None)
-            if metrics:
-                return (
-                    getattr(metrics, 'like_count', 0) * 1 +
-                    getattr(metrics, 'retweet_count', 0) * 2 +
-                    getattr(metrics, 'reply_count', 0) * 3 +
-                    getattr(metrics, 'quote_count', 0) * 2
-                )
-            return 0
-        
-        return sorted(feeds, key=engagement_score, reverse=True)
+        return sorted(feeds, key=self._score, reverse=True)
+    
+    def _score(self, feed: Any) -> int:
+        """Weighted engagement score from a feed's public metrics."""
+        metrics = getattr(feed, 'public_metrics', None)
+        if metrics:
+            return (
+                getattr(metrics, 'like_count', 0) * 1 +
+                getattr(metrics, 'retweet_count', 0) * 2 +
+                getattr(metrics, 'reply_count', 0) * 3 +
+                getattr(metrics, 'quote_count', 0) * 2
+            )
+        return 0
 
 
 class InterestStrategy:
@@ -78,19 +82,23 @@ class InterestStrategy:
         context: Dict[str, Any]
     ) -> List[Any]:
         """Rank by interest matching."""
-        logger.debug("Ranking feeds by interests", extra={
-            "agent_id": agent_id,
-            "feed_count": len(feeds)
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ranking feeds by interests", extra={
+                "agent_id": agent_id,
+                "feed_count": len(feeds)
+            })
         
         # Get agent interests from context or learn from history
         interests = context.get('agent_metadata', {}).get('interests', [])
         if not interests:
             interests = self._infer_interests(agent_id, context)
         
+        # Lowercase interests once instead of per feed per interest
+        lowered_interests = tuple(interest.lower() for interest in interests)
+        
         def interest_score(feed):
             text = getattr(feed, 'text', '').lower()
-            return sum(1 for interest in interests if interest.lower() in text)
+            return sum(1 for interest in lowered_interests if interest in text)
         
         return sorted(feeds, key=interest_score, reverse=True)
     
@@ -121,10 +129,11 @@ class CollaborativeStrategy:
         context: Dict[str, Any]
     ) -> List[Any]:
         """Rank by collaborative filtering."""
-        logger.debug("Ranking feeds collaboratively", extra={
-            "agent_id": agent_id,
-            "feed_count": len(feeds)
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ranking feeds collaboratively", extra={
+                "agent_id": agent_id,
+                "feed_count": len(feeds)
+            })
         
         # Find similar agents
         similar_agents = self._find_similar_agents(agent_id, context)
@@ -177,11 +186,12 @@ class BalancedStrategy:
         context: Dict[str, Any]
     ) -> List[Any]:
         """Rank with exploration-exploitation balance."""
-        logger.debug("Ranking feeds with balanced strategy", extra={
-            "agent_id": agent_id,
-            "feed_count": len(feeds),
-            "explore_ratio": self.explore_ratio
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ranking feeds with balanced strategy", extra={
+                "agent_id": agent_id,
+                "feed_count": len(feeds),
+                "explore_ratio": self.explore_ratio
+            })
         
         if not feeds:
             return []
@@ -190,12 +200,19 @@ class BalancedStrategy:
         exploit_count = int(len(feeds) * (1 - self.explore_ratio))
         explore_count = len(feeds) - exploit_count
         
-        # Exploit: Use engagement ranking
-        exploit_feeds = self.engagement_strategy.rank_feeds(feeds, agent_id, context)[:exploit_count]
+        # Exploit: Top engagement feeds (same order as a full sort, O(N log K))
+        exploit_feeds = heapq.nlargest(
+            exploit_count,
+            feeds,
+            key=self.engagement_strategy._score
+        )
         
-        # Explore: Random sample from remaining
-        remaining = [f for f in feeds if f not in exploit_feeds]
-        explore_feeds = random.sample(remaining, min(explore_count, len(remaining)))
+        # Explore: Random order over the rest. explore_count covers every
+        # non-exploit feed, so shuffle in place rather than sampling a copy.
+        exploit_ids = {id(f) for f in exploit_feeds}
+        explore_feeds = [f for f in feeds if id(f) not in exploit_ids]
+        random.shuffle(explore_feeds)
+        del explore_feeds[explore_count:]
         
         # Interleave exploit and explore
         result = []
@@ -218,10 +235,11 @@ class RandomStrategy:
         context: Dict[str, Any]
     ) -> List[Any]:
         """Random shuffle."""
-        logger.debug("Ranking feeds randomly", extra={
-            "agent_id": agent_id,
-            "feed_count": len(feeds)
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ranking feeds randomly", extra={
+                "agent_id": agent_id,
+                "feed_count": len(feeds)
+            })
         
         shuffled = feeds.copy()
         random.shuffle(shuffled)
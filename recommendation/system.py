@@ -2,10 +2,14 @@
 Core recommendation system implementation.
 """
 
-from typing import Dict, List, Any, Set, Optional
-from datetime import datetime
-from collections import defaultdict, Counter
+from typing import Deque, Dict, List, Any, Set, Optional
+from datetime import datetime, timezone
+from collections import defaultdict, deque, Counter
+from itertools import chain
+import heapq
 import random
+import sys
+import time
 from pydantic import BaseModel
 
 import logging
@@ -13,6 +17,24 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def format_timestamp_ns(timestamp_ns: int) -> str:
+    """
+    Format an epoch-nanosecond timestamp as a naive UTC ISO-8601 string.
+    
+    Action records store ``timestamp_ns``; use this to get the ISO form
+    that records previously carried under ``timestamp``.
+    """
+    seconds, nanos = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(
+        tzinfo=None, microsecond=nanos // 1000
+    ).isoformat()
+
+
+def _intern(value: Any) -> Any:
+    """Intern string IDs so repeated dict/set key compares hit the identity fast path."""
+    return sys.intern(value) if type(value) is str else value
+
+
 class CentralizedRecommendationSystem:
     """
     Centralized recommendation system - the platform algorithm.
@@ -21,25 +43,44 @@ class CentralizedRecommendationSystem:
     It's the "Twitter algorithm" or "Facebook algorithm" of Social Arena.
     """
     
-    def __init__(self, strategy: Optional[Any] = None):
+    def __init__(self, strategy: Optional[Any] = None, max_history: int = 500):
         """
         Initialize the recommendation system.
         
         Args:
             strategy: Recommendation strategy to use (defaults to chronological)
+            max_history: Most recent shown feeds and actions kept per agent;
+                older entries are dropped from feed_history/agent_actions
         """
         # Global state
         self.feed_pool: List[Any] = []
+        self.author_feeds: Dict[str, List[int]] = defaultdict(list)  # author -> feed_pool indices
         self.agent_pool: Dict[str, Dict[str, Any]] = {}
         self.social_graph: Dict[str, Set[str]] = defaultdict(set)
         
+        # Social graph as bitsets: bit i of following_bits[a] is set when a
+        # follows agent_ids[i]
+        self.agent_index: Dict[str, int] = {}
+        self.agent_ids: List[str] = []
+        self.following_bits: Dict[str, int] = {}
+        
         # Temporal state
         self.current_timestamp = datetime.utcnow()
-        self.feed_history: Dict[str, List[str]] = defaultdict(list)
+        self._pool_is_chronological = True  # feeds ingested in strictly increasing created_at
+        self._last_created_at: Any = None
+        self.feed_history: Dict[str, Deque[str]] = defaultdict(
+            lambda: deque(maxlen=max_history)
+        )
+        
+        # Trending state: hashtags from the most recent feeds
+        self.trending_window: Deque[List[str]] = deque(maxlen=100)
+        self.trending_counter: Counter = Counter()
         
         # Behavioral state
-        self.agent_actions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-        self.engagement_signals: Dict[str, Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+        self.agent_actions: Dict[str, Deque[Dict[str, Any]]] = defaultdict(
+            lambda: deque(maxlen=max_history)
+        )
+        self.engagement_signals: Counter = Counter()  # (target_id, action) -> count
         
         # Strategy
         self.strategy = strategy
@@ -63,18 +104,29 @@ class CentralizedRecommendationSystem:
         Args:
             feed: Feed object to ingest
         """
+        feed_id = getattr(feed, 'id', None)
+        author_id = _intern(getattr(feed, 'author_id', None))
+        created_at = getattr(feed, 'created_at', '')
+        
+        if self._pool_is_chronological and self.feed_pool:
+            try:
+                self._pool_is_chronological = created_at > self._last_created_at
+            except TypeError:
+                self._pool_is_chronological = False
+        self._last_created_at = created_at
+        
+        self.author_feeds[author_id].append(len(self.feed_pool))
         self.feed_pool.append(feed)
         self.stats["total_feeds"] += 1
         
-        # Update engagement signals
-        feed_id = getattr(feed, 'id', None)
-        author_id = getattr(feed, 'author_id', None)
+        self._track_hashtags(getattr(feed, 'text', ''))
         
-        logger.info("Ingested new feed", extra={
-            "feed_id": feed_id,
-            "author_id": author_id,
-            "total_feeds": len(self.feed_pool)
-        })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Ingested new feed", extra={
+                "feed_id": feed_id,
+                "author_id": author_id,
+                "total_feeds": len(self.feed_pool)
+            })
     
     def fetch(self, agent_id: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -88,11 +140,15 @@ class CentralizedRecommendationSystem:
             Personalized content dictionary
         """
         context = context or {}
+        agent_id = _intern(agent_id)
         
-        logger.debug(f"Fetching content for agent {agent_id}", extra={
-            "agent_id": agent_id,
-            "context": context
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Fetching content for agent {agent_id}", extra={
+                "agent_id": agent_id,
+                "context": context
+            })
+        
+        max_feeds = context.get('max_feeds', 20)
         
         # Get candidate feeds
         candidate_feeds = self._get_candidate_feeds(agent_id, context)
@@ -104,8 +160,20 @@ class CentralizedRecommendationSystem:
                 agent_id,
                 self._get_agent_context(agent_id, context)
             )
+        elif self._pool_is_chronological:
+            # Default: chronological. Candidates keep pool order, which is
+            # already oldest-first, so reversing replaces the sort.
+            ranked_feeds = candidate_feeds[::-1]
+        elif isinstance(max_feeds, int) and max_feeds >= 0:
+            # Default: chronological, newest max_feeds only (O(N log k))
+            ranked_feeds = heapq.nlargest(
+                max_feeds,
+                candidate_feeds,
+                key=lambda f: getattr(f, 'created_at', '')
+            )
         else:
-            # Default: chronological
+            # Default: chronological (None/negative limits are applied by
+            # the slice below, as for any list)
             ranked_feeds = sorted(
                 candidate_feeds,
                 key=lambda f: getattr(f, 'created_at', ''),
@@ -113,14 +181,12 @@ class CentralizedRecommendationSystem:
             )
         
         # Limit to top N
-        max_feeds = context.get('max_feeds', 20)
         ranked_feeds = ranked_feeds[:max_feeds]
         
         # Record what we showed
-        for feed in ranked_feeds:
-            feed_id = getattr(feed, 'id', None)
-            if feed_id:
-                self.feed_history[agent_id].append(feed_id)
+        self.feed_history[agent_id].extend(
+            filter(None, [getattr(feed, 'id', None) for feed in ranked_feeds])
+        )
         
         # Get suggestions
         suggested_users = self._suggest_users(agent_id, context)
@@ -138,11 +204,12 @@ class CentralizedRecommendationSystem:
             }
         }
         
-        logger.info(f"Fetched content for agent {agent_id}", extra={
-            "agent_id": agent_id,
-            "feed_count": len(ranked_feeds),
-            "candidate_count": len(candidate_feeds)
-        })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Fetched content for agent {agent_id}", extra={
+                "agent_id": agent_id,
+                "feed_count": len(ranked_feeds),
+                "candidate_count": len(candidate_feeds)
+            })
         
         return result
     
@@ -156,6 +223,10 @@ class CentralizedRecommendationSystem:
         """
         Record agent action for learning.
         
+        Each record is a dict with ``agent_id``, ``action``, ``target_id``,
+        ``timestamp_ns`` (epoch nanoseconds; format with
+        ``format_timestamp_ns``) and ``metadata``.
+        
         Args:
             agent_id: Agent performing action
             action: Action type
@@ -163,12 +234,14 @@ class CentralizedRecommendationSystem:
             metadata: Additional metadata
         """
         metadata = metadata or {}
+        agent_id = _intern(agent_id)
+        target_id = _intern(target_id)
         
         action_record = {
             "agent_id": agent_id,
             "action": action,
             "target_id": target_id,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp_ns": time.time_ns(),  # epoch ns; format on read
             "metadata": metadata
         }
         
@@ -176,13 +249,14 @@ class CentralizedRecommendationSystem:
         self.stats["total_actions"] += 1
         
         # Update engagement signals
-        self.engagement_signals[target_id][action] += 1
+        self.engagement_signals[(target_id, action)] += 1
         
-        logger.debug(f"Recorded action: {action}", extra={
-            "agent_id": agent_id,
-            "action": action,
-            "target_id": target_id
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Recorded action: {action}", extra={
+                "agent_id": agent_id,
+                "action": action,
+                "target_id": target_id
+            })
     
     def add_agent(self, agent_id: str, metadata: Dict[str, Any] = None) -> None:
         """
@@ -192,13 +266,16 @@ class CentralizedRecommendationSystem:
             agent_id: Agent identifier
             metadata: Agent metadata
         """
+        agent_id = _intern(agent_id)
         self.agent_pool[agent_id] = metadata or {}
+        self._agent_bit(agent_id)
         self.stats["total_agents"] += 1
         
-        logger.info(f"Added agent {agent_id}", extra={
-            "agent_id": agent_id,
-            "total_agents": len(self.agent_pool)
-        })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Added agent {agent_id}", extra={
+                "agent_id": agent_id,
+                "total_agents": len(self.agent_pool)
+            })
     
     def update_social_graph(
         self,
@@ -214,26 +291,43 @@ class CentralizedRecommendationSystem:
             following_id: Agent being followed
             action: "follow" or "unfollow"
         """
+        follower_id = _intern(follower_id)
+        following_id = _intern(following_id)
+        
         if action == "follow":
             self.social_graph[follower_id].add(following_id)
+            self.following_bits[follower_id] = (
+                self.following_bits.get(follower_id, 0) | self._agent_bit(following_id)
+            )
             self.stats["total_follows"] += 1
             
-            logger.info(f"{follower_id} followed {following_id}", extra={
-                "follower_id": follower_id,
-                "following_id": following_id,
-                "action": action
-            })
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"{follower_id} followed {following_id}", extra={
+                    "follower_id": follower_id,
+                    "following_id": following_id,
+                    "action": action
+                })
         elif action == "unfollow":
             self.social_graph[follower_id].discard(following_id)
+            index = self.agent_index.get(following_id)
+            if index is not None and follower_id in self.following_bits:
+                self.following_bits[follower_id] &= ~(1 << index)
             
-            logger.info(f"{follower_id} unfollowed {following_id}", extra={
-                "follower_id": follower_id,
-                "following_id": following_id,
-                "action": action
-            })
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"{follower_id} unfollowed {following_id}", extra={
+                    "follower_id": follower_id,
+                    "following_id": following_id,
+                    "action": action
+                })
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get system statistics."""
+        """
+        Get system statistics.
+        
+        ``total_actions`` counts every recorded action, while
+        ``total_actions_recorded`` counts only the actions still retained
+        (at most ``max_history`` per agent).
+        """
         return {
             **self.stats,
             "feed_pool_size": len(self.feed_pool),
@@ -248,11 +342,15 @@ class CentralizedRecommendationSystem:
         following = self.social_graph.get(agent_id, set())
         
         if following:
-            # Show feeds from followed users
-            candidate_feeds = [
-                feed for feed in self.feed_pool
-                if getattr(feed, 'author_id', None) in following
-            ]
+            # Show feeds from followed users. Each index belongs to one
+            # author and each author's list is ascending, so sorting the
+            # concatenated runs (timsort merges them in C) restores pool
+            # (ingestion) order while only touching followed authors' feeds.
+            author_indices = sorted(chain.from_iterable(
+                self.author_feeds[author_id] for author_id in following
+                if author_id in self.author_feeds
+            ))
+            candidate_feeds = [self.feed_pool[i] for i in author_indices]
         else:
             # No follows yet - show all feeds or recent popular
             candidate_feeds = self.feed_pool[-100:]  # Last 100 feeds
@@ -264,8 +362,8 @@ class CentralizedRecommendationSystem:
         return {
             "agent_metadata": self.agent_pool.get(agent_id, {}),
             "following": list(self.social_graph.get(agent_id, set())),
-            "history": self.feed_history.get(agent_id, []),
-            "actions": self.agent_actions.get(agent_id, []),
+            "history": list(self.feed_history.get(agent_id, ())),
+            "actions": list(self.agent_actions.get(agent_id, ())),
             **context
         }
     
@@ -274,35 +372,66 @@ class CentralizedRecommendationSystem:
         following = self.social_graph.get(agent_id, set())
         
         # Friends of friends
-        suggested = set()
+        suggested = 0
         for following_id in following:
-            suggested.update(self.social_graph.get(following_id, set()))
+            suggested |= self.following_bits.get(following_id, 0)
         
         # Remove already following and self
-        suggested -= following
-        suggested.discard(agent_id)
-        
-        # Return sample
-        suggested_list = list(suggested)[:5]
+        suggested &= ~self.following_bits.get(agent_id, 0)
+        index = self.agent_index.get(agent_id)
+        if index is not None:
+            suggested &= ~(1 << index)
+        
+        # Return sample, lowest bits (earliest registered agents) first
+        suggested_list = []
+        while suggested and len(suggested_list) < 5:
+            lowest = suggested & -suggested
+            suggested_list.append(self.agent_ids[lowest.bit_length() - 1])
+            suggested ^= lowest
         return [{"id": user_id} for user_id in suggested_list]
     
+    def _agent_bit(self, agent_id: str) -> int:
+        """Get the bitset mask for an agent, assigning a bit on first sight."""
+        index = self.agent_index.get(agent_id)
+        if index is None:
+            index = self.agent_index[agent_id] = len(self.agent_ids)
+            self.agent_ids.append(agent_id)
+        return 1 << index
+    
+    def _track_hashtags(self, text: str) -> None:
+        """Add a new feed's hashtags to the trending window."""
+        # Simple hashtag extraction
+        hashtags = [word for word in text.split() if word.startswith('#')]
+        
+        # Evict the oldest feed's hashtags once the window is full
+        if len(self.trending_window) == self.trending_window.maxlen:
+            for tag in self.trending_window[0]:
+                self.trending_counter[tag] -= 1
+                if not self.trending_counter[tag]:
+                    del self.trending_counter[tag]
+        
+        self.trending_window.append(hashtags)
+        self.trending_counter.update(hashtags)
+    
     def _get_trending_topics(self, context: Dict[str, Any]) -> List[str]:
-        """Get trending topics from recent feeds."""
-        # Extract hashtags from recent feeds
-        hashtags = []
-        recent_feeds = self.feed_pool[-100:]  # Last 100 feeds
-        
-        for feed in recent_feeds:
-            text = getattr(feed, 'text', '')
-            # Simple hashtag extraction
-            words = text.split()
-            feed_hashtags = [word for word in words if word.startswith('#')]
-            hashtags.extend(feed_hashtags)
-        
-        # Count and return top trending
-        if hashtags:
-            hashtag_counts = Counter(hashtags)
-            return [tag for tag, _ in hashtag_counts.most_common(5)]
-        
-        return []
+        """
+        Get trending topics from recent feeds.
+        
+        Top 5 hashtags by count; equal counts are ordered by first
+        appearance in the current window.
+        """
+        first_seen: Dict[str, int] = {}
+        position = 0
+        for hashtags in self.trending_window:
+            for tag in hashtags:
+                if tag not in first_seen:
+                    first_seen[tag] = position
+                position += 1
+        
+        top = heapq.nsmallest(
+            5,
+            self.trending_counter.items(),
+            key=lambda item: (-item[1], first_seen[item[0]])
+        )
+        return [tag for tag, _ in top]
 